@@ -0,0 +1,90 @@
+# bench_startup.py
+# Startup benchmark: cost of `import main` in a fresh interpreter, and wall
+# time from the start of this script to the worker's first fetch_once().
+#
+#   python bench_startup.py              # import timing + time to first fetch
+#   python bench_startup.py --no-network # import timing only
+#
+# The first-fetch run goes through the real startup path (on_startup ->
+# bootstrap -> worker) with the credentials in config.py and the DB file it
+# points at. The Telegram bot is replaced by a stub, the fetched entries are
+# dropped rather than stored, and the stored worker status is restored.
+import sys
+import time
+
+_T0 = time.perf_counter()
+
+import asyncio
+import statistics
+import subprocess
+
+IMPORT_RUNS = 5
+FIRST_FETCH_TIMEOUT = 120
+
+_IMPORT_PROBE = (
+    "import sys, time\n"
+    "t = time.perf_counter()\n"
+    "import main\n"
+    "dt = time.perf_counter() - t\n"
+    "loaded = [m for m in ('aiogram', 'requests', 'bs4') if m in sys.modules]\n"
+    "print(dt, ','.join(loaded))\n"
+)
+
+class _StubBot:
+    async def send_message(self, *args, **kwargs):
+        pass
+
+def bench_import():
+    times = []
+    loaded = ""
+    for _ in range(IMPORT_RUNS):
+        out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], capture_output=True, text=True, check=True)
+        dt, _, loaded = out.stdout.strip().partition(" ")
+        times.append(float(dt))
+    print(f"import main:      median {statistics.median(times) * 1000:7.1f} ms  "
+          f"min {min(times) * 1000:7.1f} ms  ({IMPORT_RUNS} runs)")
+    # aiogram is expected here (handler decorators); requests/bs4 are not
+    print(f"heavy deps loaded: {loaded or '-'}")
+
+async def bench_first_fetch():
+    import main
+    import db
+
+    t_import = time.perf_counter()
+    first_fetch = asyncio.Event()
+    result = {}
+    fetch_once = main.fetch_once
+
+    def timed_fetch_once():
+        entries = fetch_once()
+        if not first_fetch.is_set():
+            result["t"] = time.perf_counter()
+            result["entries"] = len(entries)
+            first_fetch.set()
+        # don't store (and so never forward) OTPs seen by the benchmark
+        return []
+
+    main.bot = _StubBot()
+    main.fetch_once = timed_fetch_once
+    await main.on_startup()
+    t_schema = time.perf_counter()
+    # bootstrap() hasn't run yet: make it start the worker
+    prev_status = db.get_status()
+    db.set_status("online")
+    try:
+        await asyncio.wait_for(first_fetch.wait(), FIRST_FETCH_TIMEOUT)
+    finally:
+        main.stop_worker_task()
+        if main._worker_task is not None:
+            await asyncio.wait({main._worker_task})
+        db.set_status(prev_status)
+
+    print(f"import done:      {(t_import - _T0) * 1000:7.1f} ms")
+    print(f"schema ready:     {(t_schema - _T0) * 1000:7.1f} ms")
+    print(f"first fetch done: {(result['t'] - _T0) * 1000:7.1f} ms  ({result['entries']} entries)")
+
+if __name__ == "__main__":
+    # first fetch goes first: its timings are measured from the script start
+    if "--no-network" not in sys.argv:
+        asyncio.run(bench_first_fetch())
+    bench_import()
@@ -41,6 +41,13 @@ FETCH_INTERVAL = 6
 
 # DB file
 DB_FILE = "otps_and_errors.db"
+
+# /profile command: where raw .prof/.tracemalloc dumps go, rows per summary
+# section, tracemalloc traceback depth and the max cycles per request
+PROFILE_DIR = "profiles"
+PROFILE_TOP_N = 8
+PROFILE_TRACE_DEPTH = 1
+PROFILE_MAX_CYCLES = 50
 # ==========================================================
 # Country and Service Mappings
 # ==========================================================
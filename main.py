@@ -1,8 +1,7 @@
 import asyncio
 import re
+import threading
 from datetime import datetime, UTC
-import requests
-from bs4 import BeautifulSoup
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
@@ -10,31 +9,60 @@ import html
 
 import config
 import db
+import profiler
 
-# init db
-db.init_db()
+# Nothing below touches the network, the DB or the heavy parsers at import
+# time: the bot is built in main() and requests/bs4 are imported on first
+# use. aiogram stays a top-level import since the handler decorators need
+# it. on_startup() creates the schema in a thread before polling starts,
+# then logs in from a background thread while polling runs.
 
-# aiogram bot
-bot = Bot(token=config.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+# aiogram bot (created in main())
+bot = None
 dp = Dispatcher()
 
-# requests session
-session = requests.Session()
+# requests session (created on first use)
+session = None
 
 # worker control
 _worker_task = None
 _worker_running = False
+_startup_task = None
+_background_tasks = set()
+_session_lock = threading.Lock()
+_login_lock = threading.Lock()
+
+def get_session():
+    global session
+    if session is None:
+        with _session_lock:
+            if session is None:
+                import requests
+                session = requests.Session()
+    return session
+
+def make_soup(markup):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(markup, "html.parser")
 
 # =========================================================
 # Login and token retrieval logic
 # =========================================================
 def login_and_fetch_token():
+    # bootstrap(), the Relogin button and fetch_once() may all try at once;
+    # they share one requests.Session and config.CSRF_TOKEN
+    with _login_lock:
+        return _login()
+
+def _login():
+    import requests
     print("Attempting to login and fetch new session/token...")
+    session = get_session()
     try:
         r = session.get(config.LOGIN_URL, timeout=15)
         r.raise_for_status()
 
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = make_soup(r.text)
         token_input = soup.find('input', {'name': '_token'})
         
         if not token_input or not token_input.get('value'):
@@ -62,7 +90,7 @@ def login_and_fetch_token():
             r_portal = session.get(r_login.headers['location'], timeout=15)
             r_portal.raise_for_status()
             
-            soup_portal = BeautifulSoup(r_portal.text, 'html.parser')
+            soup_portal = make_soup(r_portal.text)
             new_token_input = soup_portal.find('input', {'name': '_token'})
             
             if not new_token_input or not new_token_input.get('value'):
@@ -149,7 +177,7 @@ def extract_otps(text: str):
 
 # parsing helpers
 def parse_ranges(html_text: str):
-    soup = BeautifulSoup(html_text, "html.parser")
+    soup = make_soup(html_text)
     ranges = []
     for opt in soup.select("select#range option"):
         val = opt.get_text(strip=True)
@@ -158,10 +186,11 @@ def parse_ranges(html_text: str):
     if not ranges:
         for m in re.finditer(r"([A-Z][A-Z\s]{2,}\s+\d{2,6})", html_text):
             ranges.append(m.group(1).strip())
+    profiler.checkpoint()
     return list(dict.fromkeys(ranges))
 
 def parse_numbers(html_text: str):
-    soup = BeautifulSoup(html_text, "html.parser")
+    soup = make_soup(html_text)
     nums = []
     for tr in soup.select("table tr"):
         tds = [td.get_text(" ", strip=True) for td in tr.find_all("td")]
@@ -173,10 +202,11 @@ def parse_numbers(html_text: str):
     if not nums:
         for m in re.finditer(r"(\+?\d{6,15})", html_text):
             nums.append(m.group(1))
+    profiler.checkpoint()
     return list(dict.fromkeys(nums))
 
 def parse_messages_with_timestamps(html_text: str):
-    soup = BeautifulSoup(html_text, "html.parser")
+    soup = make_soup(html_text)
     msgs = []
     for tr in soup.select("table tbody tr"):
         tds = tr.find_all("td")
@@ -194,10 +224,12 @@ def parse_messages_with_timestamps(html_text: str):
             t = m.group(1).strip()
             if re.search(r"\d{4,8}", t):
                 msgs.append({"message": t, "fetched_at": datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S")})
+    profiler.checkpoint()
     return msgs
 
 def fetch_once():
     entries = []
+    session = get_session()
     try:
         r = session.post(config.GET_SMS_URL, data={"_token": config.CSRF_TOKEN, "from": datetime.now(UTC).date().isoformat(), "to": datetime.now(UTC).date().isoformat()}, timeout=20)
         
@@ -289,7 +321,7 @@ async def forward_entry(e):
     
     # Use BeautifulSoup to extract text within tag
     # Find the <p> tag and extract the text inside it
-    full_msg_soup = BeautifulSoup(e.get('full_msg'), 'html.parser')
+    full_msg_soup = make_soup(e.get('full_msg'))
     
     # Try to find the <p> tag where the actual message is
     message_content_tag = full_msg_soup.find('p', {'class': 'mb-0'})
@@ -333,18 +365,58 @@ async def forward_entry(e):
         except Exception:
             pass
 
+async def send_profile(run):
+    try:
+        summary = await asyncio.to_thread(profiler.summarize, run)
+        await bot.send_message(config.ADMIN_ID, f"<b>Profile</b>\n<pre>{html.escape(summary[:3500])}</pre>")
+    except Exception as exc:
+        db.save_error(f"Failed to send profile summary: {exc}")
+
+async def notify_admin(text):
+    try:
+        await bot.send_message(config.ADMIN_ID, text)
+    except Exception as exc:
+        db.save_error(f"Failed to notify admin: {exc}")
+
+def spawn(coro):
+    # keep a reference so the task isn't garbage-collected mid-flight
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def run_cycle():
+    entries = fetch_once()
+    for e in entries:
+        if not db.otp_exists(e["number"], e["otp"]):
+            db.save_otp(e["number"], e["otp"], e["full_msg"], e["service"], e["country"])
+            await forward_entry(e)
+
 # worker
 async def worker():
+    # don't poll with a half-initialised session if /on raced startup;
+    # bootstrap() logs its own failures, so don't re-raise them here
+    if _startup_task is not None:
+        await asyncio.wait({_startup_task})
     db.set_status("online")
-    await bot.send_message(config.ADMIN_ID, "✅ Worker started.")
+    # notify in the background so the first fetch isn't held up by Telegram
+    spawn(notify_admin("✅ Worker started."))
     global _worker_running
     _worker_running = True
     while _worker_running:
-        entries = fetch_once()
-        for e in entries:
-            if not db.otp_exists(e["number"], e["otp"]):
-                db.save_otp(e["number"], e["otp"], e["full_msg"], e["service"], e["country"])
-                await forward_entry(e)
+        if profiler.is_active():
+            profiler.begin_cycle()
+            try:
+                await run_cycle()
+            except BaseException:
+                # don't leave cProfile/tracemalloc running if the worker dies
+                profiler.cancel()
+                raise
+            run = profiler.end_cycle()
+            if run:
+                await send_profile(run)
+        else:
+            await run_cycle()
         await asyncio.sleep(config.FETCH_INTERVAL)
     db.set_status("offline")
     await bot.send_message(config.ADMIN_ID, "🛑 Worker stopped.")
@@ -354,6 +426,7 @@ def stop_worker_task():
     if not _worker_running:
         return
     _worker_running = False
+    profiler.cancel()
     if _worker_task and not _worker_task.done():
         _worker_task.cancel()
 
@@ -403,7 +476,9 @@ async def cb(q: types.CallbackQuery):
             await q.message.answer(f"<b>Recent Errors</b>:\n\n{text}")
         await q.answer()
     elif q.data == "relogin":
-        if login_and_fetch_token():
+        if _startup_task is not None:
+            await asyncio.wait({_startup_task})
+        if await asyncio.to_thread(login_and_fetch_token):
             await q.message.answer("✅ Manual relogin successful!")
         else:
             await q.message.answer("❌ Manual relogin failed! Check logs.")
@@ -463,23 +538,63 @@ async def cmd_errors(m: types.Message):
         text = "\n\n".join([f"{r[1]} — {r[0]}" for r in rows])
         await m.answer(f"<b>Recent Errors</b>:\n\n{text}")
 
-async def on_startup():
-    print("Attempting to login and fetch new session/token at startup.")
-    if login_and_fetch_token():
-        print("Initial login successful.")
-    else:
-        print("Initial login failed. Bot may not function properly.")
-        db.save_error("Initial login failed. Bot may not function properly.")
+@dp.message(F.text.startswith("/profile"))
+async def cmd_profile(m: types.Message):
+    if m.from_user.id != config.ADMIN_ID:
+        await m.answer("⛔ You don't have permission.")
+        return
+    if _worker_task is None or _worker_task.done():
+        await m.answer("ℹ️ Worker is not running. Use /on first.")
+        return
+    parts = m.text.split()
+    try:
+        cycles = int(parts[1]) if len(parts) > 1 else 1
+    except ValueError:
+        await m.answer("Usage: <code>/profile N</code>")
+        return
+    cycles = max(1, min(cycles, config.PROFILE_MAX_CYCLES))
+    if not profiler.request(cycles):
+        await m.answer("ℹ️ Profiling already in progress.")
+        return
+    await m.answer(f"🔬 Profiling the next <b>{cycles}</b> cycle(s)...")
 
-    if db.get_status() == "online":
-        global _worker_task
-        _worker_task = asyncio.create_task(worker())
+async def bootstrap():
+    global _worker_task
+    try:
+        print("Attempting to login and fetch new session/token at startup.")
+        # in a thread so the event loop keeps serving Telegram updates
+        if await asyncio.to_thread(login_and_fetch_token):
+            print("Initial login successful.")
+        else:
+            print("Initial login failed. Bot may not function properly.")
+            db.save_error("Initial login failed. Bot may not function properly.")
+
+        # /on may already have started a worker during the login
+        if db.get_status() == "online" and (_worker_task is None or _worker_task.done()):
+            _worker_task = asyncio.create_task(worker())
+    except Exception as e:
+        print(f"Startup failed with error: {e}")
+        db.save_error(f"Startup failed with error: {e}")
+
+async def on_startup():
+    # The schema is a few local statements: create it before polling starts
+    # so no handler ever sees a missing table. Login runs in the background,
+    # since aiogram waits for startup handlers before it starts polling.
+    global _startup_task
+    await asyncio.to_thread(db.init_db)
+    _startup_task = spawn(bootstrap())
+
+def main():
+    global bot
+    import logging
+
+    logging.basicConfig(level=logging.INFO)
+    bot = Bot(token=config.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    dp.startup.register(on_startup)
+    dp.run_polling(bot)
 
 if __name__ == "__main__":
     try:
-        import logging
-        logging.basicConfig(level=logging.INFO)
-        dp.startup.register(on_startup)
-        dp.run_polling(bot)
+        main()
     except KeyboardInterrupt:
         print("Exiting...")
@@ -0,0 +1,220 @@
+# profiler.py
+import os
+import time
+import cProfile
+import pstats
+import tracemalloc
+from datetime import datetime, UTC
+
+import config
+
+# profiling state (only touched while a /profile run is pending)
+_cycles_left = 0
+_cycles_done = 0
+_profile = None
+_cycles = []        # per cycle: (baseline, peak snapshot, end snapshot, peak bytes)
+_wall = 0.0
+_cycle_started = 0.0
+_in_cycle = False
+_owns_tracing = False
+_baseline = None
+_peak_snapshot = None
+_peak_seen = 0
+
+# Phase buckets, matched against "filename:funcname" of every profiled function.
+# Builtins show up as e.g. "<method 'recv_into' of '_socket.socket' objects>".
+PHASES = (
+    ("sqlite", ("sqlite3",)),
+    ("parsing", ("bs4", "soupsieve", "html/parser", "/re/", "_sre", "re.pattern",
+                 "charset_normalizer", "chardet", "json")),
+    ("network", ("requests", "urllib3", "http/client", "socket", "ssl", "select")),
+)
+
+def is_active() -> bool:
+    return _cycles_left > 0
+
+def request(cycles: int) -> bool:
+    """
+    Profile the next `cycles` worker iterations. Returns False, and leaves the
+    current run alone, if one is already in progress.
+    """
+    global _cycles_left, _cycles_done, _profile, _cycles, _wall
+    if is_active():
+        return False
+    _cycles_left = cycles
+    _cycles_done = 0
+    _wall = 0.0
+    _cycles = []
+    _profile = cProfile.Profile()
+    return True
+
+def _stop_tracing():
+    global _in_cycle, _owns_tracing, _baseline, _peak_snapshot
+    # leave tracing alone if the operator had it on (e.g. PYTHONTRACEMALLOC=1)
+    if _owns_tracing and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _in_cycle = False
+    _owns_tracing = False
+    _baseline = None
+    _peak_snapshot = None
+
+def cancel():
+    global _cycles_left, _profile, _cycles
+    if _profile is not None:
+        _profile.disable()
+    _stop_tracing()
+    _cycles_left = 0
+    _profile = None
+    _cycles = []
+
+def begin_cycle():
+    global _cycle_started, _in_cycle, _owns_tracing, _baseline, _peak_snapshot, _peak_seen
+    if _profile is None:
+        return
+    # allocations are traced only inside the cycle, not during the sleep
+    _owns_tracing = not tracemalloc.is_tracing()
+    if _owns_tracing:
+        tracemalloc.start(config.PROFILE_TRACE_DEPTH)
+    else:
+        # someone else's traces: only report what this cycle added on top
+        _baseline = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    _peak_snapshot = None
+    _peak_seen = 0
+    _in_cycle = True
+    _cycle_started = time.perf_counter()
+    _profile.enable()
+
+def checkpoint():
+    """
+    Called where short-lived data (soups, response bodies) is still alive.
+    Keeps a snapshot of the highest point seen in the current cycle; a no-op
+    outside a profiled cycle.
+    """
+    global _peak_snapshot, _peak_seen
+    if not _in_cycle:
+        return
+    current = tracemalloc.get_traced_memory()[0]
+    if current > _peak_seen:
+        _peak_seen = current
+        _peak_snapshot = tracemalloc.take_snapshot()
+
+def end_cycle():
+    """
+    Stop timing the current cycle. Once the last requested cycle is done,
+    returns the finished run to pass to summarize(), otherwise None.
+    """
+    global _cycles_left, _cycles_done, _wall
+    if _profile is None:
+        return None
+    _profile.disable()
+    _wall += time.perf_counter() - _cycle_started
+    peak = tracemalloc.get_traced_memory()[1]
+    _cycles.append((_baseline, _peak_snapshot, tracemalloc.take_snapshot(), peak))
+    _stop_tracing()
+    _cycles_done += 1
+    _cycles_left -= 1
+    if _cycles_left > 0:
+        return None
+    run = (_profile, _cycles, _cycles_done, _wall)
+    cancel()
+    return run
+
+def _classify(key) -> str:
+    filename, _, funcname = key
+    label = f"{filename}:{funcname}".replace("\\", "/").lower()
+    for phase, needles in PHASES:
+        if any(n in label for n in needles):
+            return phase
+    return "other"
+
+def _where(filename) -> str:
+    # "bs4/element.py" reads better than a bare "element.py" or the full path
+    parent, name = os.path.split(filename)
+    return f"{os.path.basename(parent)}/{name}" if parent else name
+
+def _short(key) -> str:
+    filename, lineno, funcname = key
+    if filename == "~":
+        return funcname
+    return f"{_where(filename)}:{lineno}({funcname})"
+
+def _save(prof, cycles):
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now(UTC).strftime("%Y%m%d-%H%M%S-%f")
+    path = os.path.join(config.PROFILE_DIR, f"worker-{stamp}")
+    prof.dump_stats(path + ".prof")
+    for i, (_, peak, end, _) in enumerate(cycles, 1):
+        if peak is not None:
+            peak.dump(f"{path}-cycle{i}-peak.tracemalloc")
+        end.dump(f"{path}-cycle{i}-end.tracemalloc")
+    return path + ".prof"
+
+_SKIP = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+def _add_allocs(allocs, snapshot, baseline):
+    # sum size/count per line; against a baseline only growth counts
+    snapshot = snapshot.filter_traces(_SKIP)
+    if baseline is None:
+        stats = [(s.traceback[0], s.size, s.count) for s in snapshot.statistics("lineno")]
+    else:
+        diff = snapshot.compare_to(baseline.filter_traces(_SKIP), "lineno")
+        stats = [(s.traceback[0], s.size_diff, s.count_diff) for s in diff if s.size_diff > 0]
+    for frame, size, count in stats:
+        old_size, old_count = allocs.get((frame.filename, frame.lineno), (0, 0))
+        allocs[(frame.filename, frame.lineno)] = (old_size + size, old_count + count)
+
+def _alloc_lines(allocs, top_n):
+    by_size = sorted(allocs.items(), key=lambda kv: kv[1][0], reverse=True)
+    return [f"  {size / 1024:8.1f} KiB {count:>6} {_where(filename)}:{lineno}"
+            for (filename, lineno), (size, count) in by_size[:top_n]]
+
+def summarize(run) -> str:
+    """Build the text summary of a finished run and dump the raw data. Blocking."""
+    prof, cycles, ncycles, wall = run
+    top_n = config.PROFILE_TOP_N
+    raw_path = _save(prof, cycles)
+    stats = pstats.Stats(prof).stats
+
+    # self time only, so nothing is counted twice
+    phases = {"network": 0.0, "parsing": 0.0, "sqlite": 0.0, "other": 0.0}
+    for key, (_, _, tt, _, _) in stats.items():
+        phases[_classify(key)] += tt
+    profiled = sum(phases.values()) or 1.0
+
+    peak = max(c[3] for c in cycles)
+    lines = [f"cycles: {ncycles}  wall: {wall:.2f}s  avg: {wall / max(ncycles, 1):.2f}s",
+             f"peak traced memory: {peak / 1024:.1f} KiB",
+             "note: includes other event-loop work that ran while a cycle awaited Telegram",
+             ""]
+    lines.append("time split:")
+    for phase, t in phases.items():
+        lines.append(f"  {phase:<8} {t:7.3f}s {100 * t / profiled:5.1f}%")
+
+    lines.append("")
+    lines.append("top cumulative:")
+    by_cum = sorted(stats.items(), key=lambda kv: kv[1][3], reverse=True)
+    for key, (_, nc, _, ct, _) in by_cum[:top_n]:
+        lines.append(f"  {ct:7.3f}s {nc:>6} {_short(key)}")
+
+    at_peak, retained = {}, {}
+    for baseline, peak_snapshot, end_snapshot, _ in cycles:
+        if peak_snapshot is not None:
+            _add_allocs(at_peak, peak_snapshot, baseline)
+        _add_allocs(retained, end_snapshot, baseline)
+
+    lines.append("")
+    lines.append("top allocations (live at parse peak, summed over cycles):")
+    lines.extend(_alloc_lines(at_peak, top_n) or ["  -"])
+
+    lines.append("")
+    lines.append("retained at cycle end:")
+    lines.extend(_alloc_lines(retained, top_n) or ["  -"])
+
+    lines.append("")
+    lines.append(f"raw: {raw_path}")
+    return "\n".join(lines)